@@ -5,8 +5,11 @@ Generate a list of all Unicode characters that are valid in Python identifiers
 Documentation reference: https://docs.python.org/3/reference/lexical_analysis.html#identifiers
 """
 
+import argparse
 import sys
 import unicodedata
+from functools import lru_cache
+from itertools import chain
 
 WARNING = """\
 <!-- WARNING: This file is generated automatically, do not edit it
@@ -15,6 +18,17 @@ directly. Rather, edit the file generate_names.py which generates this file.
 
 """
 
+HEADER = f"""\
+This page was generated using Python version {sys.version.split()[0]}, which
+uses Unicode version {unicodedata.unidata_version}
+
+"""
+
+TABLE_HEADER = """\
+| Code point | Character | Name |
+|------------|-----------|------|
+"""
+
 FOOTER = """
 
 [^unknown]: The Unicode name for this character is not present in the
@@ -27,76 +41,109 @@ FOOTER = """
 def generate_characters():
     start_characters = []
     continue_characters = []
-    for i in range(0x110000):
+    # Surrogates (U+D800-U+DFFF) and the private use areas (U+E000-U+F8FF and
+    # planes 15 and 16) are fixed by the Unicode stability policy and can
+    # never be identifier characters, so they are not scanned.
+    for i in chain(range(0xD800), range(0xF900, 0xF0000)):
         c = chr(i)
         if c.isidentifier():
-            start_characters.append(c)
+            start_characters.append(i)
         elif ('a' + c).isidentifier():
-            continue_characters.append(c)
+            continue_characters.append(i)
 
     return start_characters, continue_characters
 
-def write_character(f, c):
+def character_name(c):
     try:
-        name = unicodedata.name(c)
+        return unicodedata.name(c)
     except ValueError:
-        name = "(unknown) [^unknown]"
+        return "(unknown) [^unknown]"
+
+# NFKC expansions reuse a small set of characters (ASCII letters, digits,
+# common marks), so their code points and names are worth caching. Rows are
+# nearly all distinct and are formatted directly.
+@lru_cache(maxsize=None)
+def expansion_code_point(c):
+    return f"U+{ord(c):04X}"
+
+@lru_cache(maxsize=None)
+def expansion_name(c):
+    return unicodedata.name(c)
+
+def normalization_suffix(c):
+    # A character with no decomposition mapping is its own NFKC form (Hangul
+    # syllables decompose algorithmically, but recompose to themselves), so
+    # only normalize the rest.
+    if not unicodedata.decomposition(c):
+        return ''
     n = unicodedata.normalize('NFKC', c)
-    f.write(f"| U+{ord(c):04X} | {c} | {name}")
-    if c != n:
-        names = ', '.join(unicodedata.name(i) for i in n)
-        f.write(f" (normalizes to {', '.join('U+{x:04X}'.format(x=ord(i)) for i in n)}: {n} ({names}))")
-    f.write('|\n')
+    if c == n:
+        return ''
+    codes = ', '.join(expansion_code_point(i) for i in n)
+    names = ', '.join(expansion_name(i) for i in n)
+    return f" (normalizes to {codes}: {n} ({names}))"
+
+def format_character(cp):
+    c = chr(cp)
+    return f"| U+{cp:04X} | {c} | {character_name(c)}{normalization_suffix(c)}|\n"
+
+def write_output(path, buf, gz=False):
+    if gz:
+        # Only the opt-in --gz mode needs gzip, so don't import it otherwise
+        import gzip
+        # mtime=0 keeps the gzip header, and so the output, reproducible
+        with gzip.GzipFile(path + '.gz', 'wb', compresslevel=6, mtime=0) as f:
+            f.write(buf)
+        return
+    with open(path, 'wb') as f:
+        f.write(buf)
+
+def write_file(path, title, intro, codepoints, gz=False):
+    parts = [
+        WARNING,
+        f"## {title}\n\n",
+        intro,
+        HEADER,
+        f"There are a total of {len(codepoints)} characters in this list.\n\n",
+        TABLE_HEADER,
+    ]
+    parts.extend([format_character(cp) for cp in codepoints])
+    parts.append(FOOTER)
+    write_output(path, ''.join(parts).encode('utf-8'), gz)
 
 def main():
-    start_characters, continue_characters = generate_characters()
-
-    header = f"""\
-This page was generated using Python version {sys.version.split()[0]}, which
-uses Unicode version {unicodedata.unidata_version}
-
-"""
+    parser = argparse.ArgumentParser(description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--gz', action='store_true', help="""Write
+    gzip-compressed docs/*.md.gz files instead of the plain Markdown files
+    (GitHub Pages needs the plain files).""")
+    args = parser.parse_args()
 
-    table_header = """\
-| Code point | Character | Name |
-|------------|-----------|------|
-"""
+    start_characters, continue_characters = generate_characters()
+    ext = '.md.gz' if args.gz else '.md'
 
-    with open("docs/start-characters.md", 'w') as f:
-        f.write(WARNING)
-        f.write("## Start Characters\n\n")
-        f.write("""
+    start_intro = f"""
 These are the characters that are valid as any character in a Python variable
 name. For a list of characters that are valid for any character other than the
 first, see the [Continue Characters](continue-characters).
 
-You can also view the <a href="start-characters.md">raw markdown</a> for this page.
+You can also view the <a href="start-characters{ext}">raw markdown</a> for this page.
 
-""")
-        f.write(header)
-        f.write(f"There are a total of {len(start_characters)} characters in this list.\n\n")
-        f.write(table_header)
-        for c in start_characters:
-            write_character(f, c)
-        f.write(FOOTER)
+"""
 
-    with open('docs/continue-characters.md', 'w') as f:
-        f.write(WARNING)
-        f.write("## Continue Characters\n\n")
-        f.write("""
+    continue_intro = f"""
 These are the characters that are valid as any character other than the first
 in a Python variable name. For a list of characters that are valid for any
 character including the first, see the [Start Characters](start-characters).
 
-You can also view the <a href="continue-characters.md">raw markdown</a> for this page.
+You can also view the <a href="continue-characters{ext}">raw markdown</a> for this page.
+
+"""
 
-""")
-        f.write(header)
-        f.write(f"There are a total of {len(continue_characters)} characters in this list.\n\n")
-        f.write(table_header)
-        for c in continue_characters:
-            write_character(f, c)
-        f.write(FOOTER)
+    write_file("docs/start-characters.md", "Start Characters", start_intro,
+               start_characters, args.gz)
+    write_file("docs/continue-characters.md", "Continue Characters",
+               continue_intro, continue_characters, args.gz)
 
 if __name__ == '__main__':
     main()